@@ -1,26 +1,97 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import os
 import re
 import time
 import json
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
-from ml_predictions import predict_match_outcome
+from requests.adapters import HTTPAdapter, Retry
+import lxml.html
+from ml_predictions import predict_batch
 
-# Import Selenium conditionally - only used locally
+# Use orjson for JSON serialization when available - its C encoder/decoder
+# is several times faster than stdlib json on the odds payloads
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service as ChromeService
-    from selenium.webdriver.chrome.options import Options
-    from webdriver_manager.chrome import ChromeDriverManager
-    SELENIUM_AVAILABLE = True
+    import orjson
+    def _dumps(obj):
+        return orjson.dumps(obj)
+    def _loads(data):
+        return orjson.loads(data)
 except ImportError:
-    SELENIUM_AVAILABLE = False
+    def _dumps(obj):
+        return json.dumps(obj)
+    def _loads(data):
+        return json.loads(data)
+
+# Import Redis conditionally - caching is skipped if it is not configured
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for cross-origin requests
 
+# Connect to Redis for caching scraped odds (optional)
+redis_client = None
+if REDIS_AVAILABLE and os.environ.get('REDIS_URL'):
+    try:
+        redis_client = redis.Redis.from_url(os.environ['REDIS_URL'])
+    except Exception as e:
+        print(f"Redis connection error: {e}. Caching disabled.")
+        redis_client = None
+
+# Matches the "22/06/25 - 20:00" start-time format on the odds page;
+# compiled once since it runs against hundreds of spans per scrape
+_TIME_RE = re.compile(r"\d{2}/\d{2}/\d{2} - \d{2}:\d{2}")
+
+# Cache settings - odds change slowly enough that a short TTL is safe
+ODDS_CACHE_KEY = "sp:odds"
+ODDS_INDEX_KEY = "sp:index"
+ODDS_LOCK_KEY = "sp:odds:lock"
+ODDS_CACHE_TTL = 45  # seconds
+
+# Shared HTTP session for the non-Selenium path - pooled connections skip the
+# TCP+TLS handshake on warm requests, and transient failures are retried
+_session = requests.Session()
+_session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate'
+})
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                       max_retries=Retry(total=2, backoff_factor=0.3)))
+
+# SportPesa's Angular front-end loads its odds from this prematch JSON API;
+# calling it directly skips HTML rendering and parsing entirely
+SPORTPESA_API_URL = os.environ.get(
+    'SPORTPESA_API_URL',
+    "https://www.ke.sportpesa.com/api/upcoming/prematches"
+    "?type=prematch&sport_id=14&section=upcoming&o=events&pag_count=50&pag_min=1"
+)
+
+def _json_response(payload, max_age=30):
+    """Build a JSON response with Cache-Control and ETag handling.
+
+    payload is already-serialized JSON (str or bytes). Polling clients that
+    present a matching If-None-Match get an empty 304 instead of the body.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    # RFC 7232 entity-tags are quoted strings
+    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = Response(status=304)
+    else:
+        response = Response(payload, mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
@@ -30,8 +101,18 @@ def health_check():
 def get_odds():
     """Endpoint to get all odds from SportPesa"""
     try:
-        odds_data = scrape_sportpesa()
-        return jsonify(odds_data)
+        # The cache already holds serialized JSON - return it as-is instead
+        # of deserializing and re-serializing through jsonify
+        if redis_client is not None:
+            try:
+                cached = redis_client.get(ODDS_CACHE_KEY)
+                if cached:
+                    return _json_response(cached)
+            except Exception as e:
+                print(f"Redis read error: {e}")
+
+        odds_data = fetch_all_odds()
+        return _json_response(_dumps(odds_data))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -39,20 +120,52 @@ def get_odds():
 def get_match_odds(match_id):
     """Get odds for a specific match by ID"""
     try:
-        odds_data = scrape_sportpesa()
+        # Check the per-match cache first so string searches are cached too
+        match_cache_key = f"sp:match:{match_id}"
+        if redis_client is not None:
+            try:
+                cached = redis_client.get(match_cache_key)
+                if cached:
+                    return _json_response(cached)
+            except Exception as e:
+                print(f"Redis read error: {e}")
+
+        odds_data = fetch_all_odds()
         # Find match by ID (index in this case)
+        match = None
         try:
-            match_id = int(match_id)
-            if 0 <= match_id < len(odds_data):
-                return jsonify(odds_data[match_id])
-            else:
-                return jsonify({"error": "Match not found"}), 404
+            index = int(match_id)
+            if 0 <= index < len(odds_data):
+                match = odds_data[index]
         except ValueError:
-            # If match_id is not an integer, try to find by match name
-            for match in odds_data:
-                if match_id.lower() in match["match"].lower():
-                    return jsonify(match)
+            # If match_id is not an integer, try to find by match name.
+            # Full names hit the cached lowercase index in O(1)
+            if redis_client is not None:
+                try:
+                    cached_index = redis_client.get(ODDS_INDEX_KEY)
+                    if cached_index:
+                        index = _loads(cached_index).get(match_id.lower())
+                        if index is not None and 0 <= index < len(odds_data):
+                            match = odds_data[index]
+                except Exception as e:
+                    print(f"Redis read error: {e}")
+            if match is None:
+                # Partial names fall back to the substring scan
+                for candidate in odds_data:
+                    if match_id.lower() in candidate["match"].lower():
+                        match = candidate
+                        break
+
+        if match is None:
             return jsonify({"error": "Match not found"}), 404
+
+        payload = _dumps(match)
+        if redis_client is not None:
+            try:
+                redis_client.setex(match_cache_key, ODDS_CACHE_TTL, payload)
+            except Exception as e:
+                print(f"Redis write error: {e}")
+        return _json_response(payload)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -60,118 +173,270 @@ def get_match_odds(match_id):
 def get_predictions():
     """Get ML predictions for upcoming matches"""
     try:
-        odds_data = scrape_sportpesa()
-        for match in odds_data:
-            # Add predictions to each match
-            prediction = predict_match_outcome(
-                match["teams"][0],  # Home team
-                match["teams"][1],  # Away team
-                match["full_time_odds"]  # Using odds as features
-            )
+        odds_data = fetch_all_odds()
+        # Predict every match in one vectorized batch
+        predictions = predict_batch(
+            [match["teams"][0] for match in odds_data],  # Home teams
+            [match["teams"][1] for match in odds_data],  # Away teams
+            [match["full_time_odds"] for match in odds_data]  # Using odds as features
+        )
+        for match, prediction in zip(odds_data, predictions):
             match["prediction"] = prediction
-        
-        return jsonify(odds_data)
+
+        return _json_response(_dumps(odds_data))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/predictions/batch', methods=['POST'])
+def post_predictions_batch():
+    """Predict a caller-supplied list of matches without scraping.
+
+    Expects a JSON list of {"home": ..., "away": ..., "odds": {...}} objects
+    and returns one prediction per entry, in order. Lets clients amortize a
+    single round-trip over many predictions.
+    """
+    try:
+        # Odds are optional, but when present they must be a dict of numeric
+        # (or null) values - anything else would surface as a 500 downstream
+        def valid_odds(odds):
+            if odds is None:
+                return True
+            if not isinstance(odds, dict):
+                return False
+            return all(value is None or isinstance(value, (int, float))
+                       for value in odds.values())
+
+        matches = request.get_json(silent=True)
+        if not isinstance(matches, list) or not all(
+                isinstance(m, dict) and m.get("home") and m.get("away")
+                and valid_odds(m.get("odds")) for m in matches):
+            return jsonify({"error": "Expected a JSON list of {home, away, odds} objects"}), 400
+
+        predictions = predict_batch(
+            [m["home"] for m in matches],
+            [m["away"] for m in matches],
+            [m.get("odds") for m in matches]
+        )
+        return Response(_dumps(predictions), mimetype="application/json")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 def scrape_sportpesa():
-    """Scrape data from SportPesa website"""
-    url = "https://www.ke.sportpesa.com/en/sports-betting/football-1/"
-    
-    # Check if running in cloud or Selenium is not available
-    use_selenium = SELENIUM_AVAILABLE and os.environ.get('RUNNING_IN_CLOUD', 'false').lower() != 'true'
-    
-    if use_selenium:
-        # Use Selenium for local development
-        try:
-            # Configure Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")  # Run in headless mode
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            
-            # For local development
-            driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), 
-                                    options=chrome_options)
-                                    
-            # Load SportPesa football page
-            driver.get(url)
-            time.sleep(3)
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(6)  # Wait for JavaScript to load odds
-
-            # Parse the HTML
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            driver.quit()
-        except Exception as e:
-            print(f"Selenium error: {e}. Falling back to requests.")
-            use_selenium = False
-    
-    if not use_selenium:
-        # Fallback to requests for cloud environments
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    """Get SportPesa odds, serving from the Redis cache when possible"""
+    if redis_client is None:
+        return _scrape_sportpesa_live()
+
+    have_lock = False
+    try:
+        cached = redis_client.get(ODDS_CACHE_KEY)
+        if cached:
+            return _loads(cached)
+
+        # Cache miss - take a short lock so only one request scrapes at a time
+        # while the others wait for it to refill the cache (avoids a stampede)
+        have_lock = bool(redis_client.set(ODDS_LOCK_KEY, "1", nx=True, ex=30))
+        if not have_lock:
+            for _ in range(20):
+                time.sleep(0.5)
+                cached = redis_client.get(ODDS_CACHE_KEY)
+                if cached:
+                    return _loads(cached)
+    except Exception as e:
+        print(f"Redis read error: {e}")
+        return _scrape_sportpesa_live()
+
+    try:
+        results = _scrape_sportpesa_live()
+        if results:
+            # A failed cache store must not discard a successful scrape
+            try:
+                _store_odds_cache(results)
+            except Exception as e:
+                print(f"Redis write error: {e}")
+        return results
+    finally:
+        # Only the caller that took the lock may release it - a waiter that
+        # timed out must not free the lock out from under the scraper
+        if have_lock:
+            try:
+                redis_client.delete(ODDS_LOCK_KEY)
+            except Exception as e:
+                print(f"Redis write error: {e}")
+
+def _store_odds_cache(results):
+    """Write scraped odds and the lowercase name -> id index to Redis.
+
+    The index lets name lookups resolve as hash hits instead of linear scans.
+    """
+    redis_client.setex(ODDS_CACHE_KEY, ODDS_CACHE_TTL, _dumps(results))
+    name_index = {match["match"].lower(): match["id"] for match in results}
+    redis_client.setex(ODDS_INDEX_KEY, ODDS_CACHE_TTL, _dumps(name_index))
+
+def _scrape_sportpesa_live():
+    """Fetch SportPesa odds, preferring the JSON API over the HTML page"""
+    try:
+        results = _scrape_sportpesa_api()
+        if results:
+            return results
+        print("SportPesa API returned no events. Falling back to HTML scrape.")
+    except Exception as e:
+        print(f"SportPesa API error: {e}. Falling back to HTML scrape.")
+    return _scrape_sportpesa_html()
+
+def _format_kickoff(value):
+    """Format an API timestamp like the site's '22/06/25 - 20:00' display"""
+    try:
+        if isinstance(value, (int, float)):
+            # Epoch milliseconds
+            kickoff = datetime.fromtimestamp(value / 1000)
+        else:
+            kickoff = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return kickoff.strftime("%d/%m/%y - %H:%M")
+    except (TypeError, ValueError):
+        return ""
+
+def _scrape_sportpesa_api():
+    """Fetch odds from SportPesa's prematch JSON API.
+
+    This is the endpoint the site's own Angular front-end calls, so the odds
+    arrive as structured JSON - no browser and no HTML parsing involved.
+    """
+    response = _session.get(SPORTPESA_API_URL, timeout=(3, 10))
+    response.raise_for_status()
+    events = response.json()
+    if isinstance(events, dict):
+        events = events.get("data") or events.get("events") or []
+
+    results = []
+    for event in events:
+        competitors = event.get("competitors") or []
+        if len(competitors) < 2:
+            continue
+        home_team = (competitors[0].get("name") or "").strip()
+        away_team = (competitors[1].get("name") or "").strip()
+        if not home_team or not away_team:
+            continue
+
+        # Flatten the event's markets into (market, selection) -> odd
+        selections = {}
+        for market in event.get("markets") or []:
+            market_name = (market.get("name") or "").lower()
+            for selection in market.get("selections") or []:
+                selection_name = (selection.get("name") or "").lower()
+                try:
+                    selections[(market_name, selection_name)] = float(selection.get("odds"))
+                except (TypeError, ValueError):
+                    continue
+
+        # Helper to look an odd up by market and selection prefix
+        def find_odds(market_key, selection_key):
+            for (market_name, selection_name), odd in selections.items():
+                if market_key in market_name and selection_name.startswith(selection_key):
+                    return odd
+            return None
+
+        match_data = {
+            "id": len(results),
+            "match": f"{home_team} vs {away_team}",
+            "teams": (home_team, away_team),
+            "time": _format_kickoff(event.get("date") or event.get("scheduled")),
+            "full_time_odds": {
+                "home": find_odds("3 way", "1"),
+                "draw": find_odds("3 way", "x"),
+                "away": find_odds("3 way", "2")
+            },
+            "double_chance": {
+                "1X": find_odds("double chance", "1x"),
+                "X2": find_odds("double chance", "x2"),
+                "12": find_odds("double chance", "12")
+            },
+            "over_under": {
+                "over": find_odds("under", "over"),
+                "under": find_odds("under", "under")
+            },
+            "btts": {
+                "yes": find_odds("both teams", "yes"),
+                "no": find_odds("both teams", "no")
+            }
         }
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Extract match teams
-        teams = [team.get_text(strip=True) for team in soup.select("div.event-team.ng-binding")]
-        team_pairs = [(teams[i], teams[i+1]) for i in range(0, len(teams) - 1, 2)]
-        matches = [f"{teams[i]} vs {teams[i+1]}" for i in range(0, len(teams) - 1, 2)]
-
-        # Extract match dates
-        raw_times = [el.get_text(strip=True) for el in soup.select("span.ng-binding")]
-        match_times = [t for t in raw_times if re.match(r"\d{2}/\d{2}/\d{2} - \d{2}:\d{2}", t)]
-
-        # Helper to extract odds by data-qa attribute
-        def get_odds(selector):
-            return [el.get_text(strip=True) for el in soup.select(f'div[data-qa="{selector}"] > div.ng-binding')]
-
-        # Full time 1X2 odds
-        full_time_raw = [
-            el.get_text(strip=True)
-            for el in soup.select('div.event-selection > div.ng-binding')
-            if el.get_text(strip=True).replace('.', '', 1).isdigit()
-        ]
-        full_time_grouped = [full_time_raw[i:i+3] for i in range(0, len(full_time_raw), 3)]
-
-        # Other market odds
-        dc_1x = get_odds("prematch-event-selections-1x")
-        dc_x2 = get_odds("prematch-event-selections-x2")
-        dc_12 = get_odds("prematch-event-selections-12")
-
-        ou_over = get_odds("prematch-event-selections-over")
-        ou_under = get_odds("prematch-event-selections-under")
-
-        btts_yes = get_odds("prematch-event-selections-yes")
-        btts_no = get_odds("prematch-event-selections-no")
+        results.append(match_data)
+
+    return results
+
+def _scrape_sportpesa_html():
+    """Scrape data from the SportPesa website's HTML as a fallback"""
+    url = "https://www.ke.sportpesa.com/en/sports-betting/football-1/"
+
+    try:
+        response = _session.get(url, timeout=(3, 10))
+        page_html = response.text
+        # Parse the HTML with lxml directly - xpath() hands back text lists
+        # straight from C instead of walking every node in Python
+        tree = lxml.html.fromstring(page_html)
+
+        # Walk the per-match rows once instead of re-scanning the whole
+        # document for every market - all fields for a match come from its
+        # own row, so the markets can never drift out of alignment either
+        rows = tree.xpath('//div[contains(@class, "event-row")]')
+
+        # Helper to extract one odd from a row by data-qa attribute
+        def row_odds(row, selector):
+            for text in row.xpath(f'.//div[@data-qa="{selector}"]/div[contains(@class, "ng-binding")]/text()'):
+                text = text.strip()
+                if text.replace('.', '', 1).isdigit():
+                    return float(text)
+            return None
 
         # Structure the data
         results = []
-        for i in range(min(len(matches), len(full_time_grouped), len(match_times))):
+        for row in rows:
+            teams = [
+                el.text_content().strip()
+                for el in row.xpath('.//div[contains(@class, "event-team") and contains(@class, "ng-binding")]')
+            ]
+            if len(teams) < 2:
+                continue
+            home_team, away_team = teams[0], teams[1]
+
+            # Match start time
+            match_time = ""
+            for text in row.xpath('.//span[contains(@class, "ng-binding")]/text()'):
+                text = text.strip()
+                if _TIME_RE.match(text):
+                    match_time = text
+                    break
+
+            # Full time 1X2 odds
+            full_time = [
+                text for text in (
+                    t.strip()
+                    for t in row.xpath('.//div[contains(@class, "event-selection")]/div[contains(@class, "ng-binding")]/text()')
+                )
+                if text.replace('.', '', 1).isdigit()
+            ]
+
             match_data = {
-                "id": i,
-                "match": matches[i],
-                "teams": team_pairs[i],
-                "time": match_times[i] if i < len(match_times) else "",
+                "id": len(results),
+                "match": f"{home_team} vs {away_team}",
+                "teams": (home_team, away_team),
+                "time": match_time,
                 "full_time_odds": {
-                    "home": float(full_time_grouped[i][0]) if i < len(full_time_grouped) and len(full_time_grouped[i]) >= 1 else None,
-                    "draw": float(full_time_grouped[i][1]) if i < len(full_time_grouped) and len(full_time_grouped[i]) >= 2 else None,
-                    "away": float(full_time_grouped[i][2]) if i < len(full_time_grouped) and len(full_time_grouped[i]) >= 3 else None
+                    "home": float(full_time[0]) if len(full_time) >= 1 else None,
+                    "draw": float(full_time[1]) if len(full_time) >= 2 else None,
+                    "away": float(full_time[2]) if len(full_time) >= 3 else None
                 },
                 "double_chance": {
-                    "1X": float(dc_1x[i]) if i < len(dc_1x) else None,
-                    "X2": float(dc_x2[i]) if i < len(dc_x2) else None,
-                    "12": float(dc_12[i]) if i < len(dc_12) else None
+                    "1X": row_odds(row, "prematch-event-selections-1x"),
+                    "X2": row_odds(row, "prematch-event-selections-x2"),
+                    "12": row_odds(row, "prematch-event-selections-12")
                 },
                 "over_under": {
-                    "over": float(ou_over[i]) if i < len(ou_over) else None,
-                    "under": float(ou_under[i]) if i < len(ou_under) else None
+                    "over": row_odds(row, "prematch-event-selections-over"),
+                    "under": row_odds(row, "prematch-event-selections-under")
                 },
                 "btts": {
-                    "yes": float(btts_yes[i]) if i < len(btts_yes) else None,
-                    "no": float(btts_no[i]) if i < len(btts_no) else None
+                    "yes": row_odds(row, "prematch-event-selections-yes"),
+                    "no": row_odds(row, "prematch-event-selections-no")
                 }
             }
             results.append(match_data)
@@ -219,7 +484,72 @@ def generate_mock_data():
         }
     ]
 
+# Bookmaker scrapers to run per odds request - additional sources get
+# appended here and their network waits overlap in the shared pool
+SCRAPERS = [scrape_sportpesa]
+_scraper_pool = ThreadPoolExecutor(max_workers=8)
+
+def fetch_all_odds():
+    """Run every configured scraper concurrently and merge their matches"""
+    if len(SCRAPERS) == 1:
+        # Nothing to overlap with a single source - skip the pool round-trip
+        return SCRAPERS[0]()
+
+    results = []
+    for matches in _scraper_pool.map(lambda scraper: scraper(), SCRAPERS):
+        results.extend(matches)
+    # Re-number so ids stay unique across sources
+    for i, match in enumerate(results):
+        match["id"] = i
+    return results
+
+REFRESH_INTERVAL = 30  # seconds
+
+def _refresh_odds_loop():
+    """Keep the odds cache warm so requests never pay scrape latency"""
+    while True:
+        try:
+            # Refresh unconditionally - reading through the cache would leave
+            # a cold window between the TTL expiring and the next tick. The
+            # lock still keeps other workers and requests from scraping too
+            if redis_client.set(ODDS_LOCK_KEY, "1", nx=True, ex=30):
+                try:
+                    results = _scrape_sportpesa_live()
+                    if results:
+                        _store_odds_cache(results)
+                finally:
+                    redis_client.delete(ODDS_LOCK_KEY)
+        except Exception as e:
+            print(f"Background refresh error: {e}")
+        time.sleep(REFRESH_INTERVAL)
+
+_refresher_started = False
+_refresher_lock = threading.Lock()
+
+@app.before_request
+def _start_odds_refresher():
+    """Start the cache refresher in this process, once, on the first request.
+
+    Deliberately not started at import: under gunicorn --preload the module
+    is imported in the master, and a refresher driving the pooled HTTP
+    session there would share live sockets with forked workers -
+    requests/urllib3 connection pools are not fork-safe. Starting on the
+    first request puts the thread in each worker instead, and the Redis lock
+    keeps the workers' refreshers from scraping concurrently. Only
+    worthwhile with Redis, where the result is shared across requests.
+    """
+    global _refresher_started
+    if _refresher_started or redis_client is None:
+        return
+    with _refresher_lock:
+        if not _refresher_started:
+            threading.Thread(target=_refresh_odds_loop, daemon=True).start()
+            _refresher_started = True
+
 if __name__ == "__main__":
-    # Run the Flask app
+    # Flask's dev server is single-threaded and only for local development.
+    # Production runs under gunicorn with threaded workers (see Procfile) so
+    # IO-bound scrapes overlap, and --preload imports the app once in the
+    # master before forking workers
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=os.environ.get("DEBUG", "false").lower() == "true")